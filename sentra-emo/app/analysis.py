@@ -1,8 +1,18 @@
 from typing import Dict, List, Tuple, Optional, Any
 from pathlib import Path
+from dataclasses import dataclass
+import functools
 import json
 import logging
 
+import numpy as np
+
+try:  # optional fast JSON; falls back to stdlib json
+    import orjson  # type: ignore
+except Exception:  # noqa: BLE001
+    orjson = None  # type: ignore[assignment]
+
+from .analysis_kernels import score as _score_kernel
 from .config import (
     get_vad_config_paths,
     PROJECT_ROOT,
@@ -12,9 +22,38 @@ from .config import (
 
 logger = logging.getLogger(__name__)
 
+NEUTRAL_VAD: Tuple[float, float, float] = (0.5, 0.5, 0.5)
+
+
+def _read_json(p: Path) -> Any:
+    if orjson is not None:
+        return orjson.loads(p.read_bytes())
+    return json.loads(p.read_text(encoding="utf-8"))
+
+
+def _write_json(p: Path, data: Any) -> None:
+    if orjson is not None:
+        p.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+@functools.lru_cache(maxsize=2048)
+def _norm(label: Any) -> str:
+    """Lower-cased string form of a label; emotion label sets are small, so this is nearly always a cache hit."""
+    return label.lower() if label.__class__ is str else str(label).lower()
+
 
 _negative_labels: Optional[set[str]] = None
+# negative canonical labels plus every alias resolving to one; lets derive_stress skip canonical()
+_negative_labels_expanded: frozenset[str] = frozenset()
 _last_emotion_dir: Optional[Path] = None
+# (emotion_model_dir, labels) of the last successful init_vad_mapper call; repeated calls are no-ops
+_vad_init_key: Optional[Tuple[str, Tuple[str, ...]]] = None
+# (path, labels) last written to unknown_labels.json; the file is only rewritten when this changes
+_last_written_unknowns: Optional[Tuple[str, frozenset[str]]] = None
+# (path, mtime) of unknown_labels.json as last parsed by get_vad_status
+_unknown_mtime_key: Optional[Tuple[str, float]] = None
 _vad_status: Dict[str, Any] = {
     "emotion_model_dir": None,
     "map_path": None,
@@ -36,44 +75,148 @@ class VADMapper:
             str(k).lower(): (float(v), float(a), float(d)) for k, (v, a, d) in mapping.items()
         }
         self.alias: Dict[str, str] = {str(k).lower(): str(v).lower() for k, v in (alias or {}).items()}
+        # precompiled lookups: every canonical label and alias -> canonical label / resolved (v,a,d)
+        # alias chains (a -> b -> c) are followed to the end, so every path resolves the same label
+        self._canon: Dict[str, str] = {l: l for l in self.mapping}
+        for a in self.alias:
+            self._canon[a] = self._follow_alias(a)
+        # without aliases canonical(label) is just the lower-cased label
+        self._has_aliases: bool = bool(self.alias)
+        self._resolved: Dict[str, Tuple[float, float, float]] = {
+            l: self.mapping[c] for l, c in self._canon.items() if c in self.mapping
+        }
+        # vectorized lookup: row 0 is the neutral fallback for unknown labels,
+        # aliases point at their canonical row (or neutral if the target is unmapped)
+        canon_rows = {l: i + 1 for i, l in enumerate(self.mapping)}
+        self._label_to_row: Dict[str, int] = dict(canon_rows)
+        for a in self.alias:
+            self._label_to_row[a] = canon_rows.get(self._canon[a], 0)
+        self._vad_arr = np.asarray([NEUTRAL_VAD] + list(self.mapping.values()), dtype=np.float32).reshape(-1, 3)
+
+    def _follow_alias(self, label: str) -> str:
+        """Resolve label through the alias table until a non-alias label (or a cycle) is reached."""
+        seen = {label}
+        cur = self.alias.get(label, label)
+        while cur in self.alias and cur not in seen:
+            seen.add(cur)
+            cur = self.alias[cur]
+        return cur
 
     def canonical(self, label: str) -> str:
-        l = str(label).lower()
-        return self.alias.get(l, l)
+        l = _norm(label)
+        return self._canon.get(l, l)
 
     def map_label(self, label: str) -> Tuple[float, float, float]:
-        key = self.canonical(label)
-        return self.mapping.get(key, (0.5, 0.5, 0.5))
+        return self._resolved.get(_norm(label), NEUTRAL_VAD)
 
     def map_distribution(self, distribution: List[Tuple[str, float]]) -> Tuple[float, float, float]:
         if not distribution:
             return 0.5, 0.5, 0.5
-        v = a = d = 0.0
-        total = 0.0
-        for label, score in distribution:
-            vv, aa, dd = self.map_label(label)
-            v += score * vv
-            a += score * aa
-            d += score * dd
-            total += score
+        rows_get = self._label_to_row.get
+        norm = _norm
+        idxs = np.fromiter((rows_get(norm(l), 0) for l, _ in distribution), dtype=np.int32, count=len(distribution))
+        scores = np.fromiter((s for _, s in distribution), dtype=np.float32, count=len(distribution))
+        total = float(scores.sum())
         if total <= 0:
             return 0.5, 0.5, 0.5
-        return v / total, a / total, d / total
+        v, a, d = (scores @ self._vad_arr[idxs]) / total
+        return float(v), float(a), float(d)
+
+    def _resolve_into(
+        self,
+        distribution: List[Tuple[str, float]],
+        neg_set: frozenset[str],
+        canonicalize: bool,
+        idxs: np.ndarray,
+        scores: np.ndarray,
+        neg: np.ndarray,
+    ) -> List[Tuple[str, float]]:
+        """Fill table rows / scores / negative flags for each item and return the output pairs."""
+        canon_get = self._canon.get
+        has_aliases = self._has_aliases
+        rows_get = self._label_to_row.get
+        norm = _norm
+        pairs: List[Tuple[str, float]] = []
+        append = pairs.append
+        for i, (label, score) in enumerate(distribution):
+            l = norm(label)
+            s = float(score)
+            idxs[i] = rows_get(l, 0)
+            scores[i] = s
+            neg[i] = l in neg_set
+            if not canonicalize:
+                append((label, s))
+            elif has_aliases:
+                append((canon_get(l, l), s))
+            else:
+                append((l, s))
+        return pairs
+
+    def analyze(
+        self, distribution: List[Tuple[str, float]], neg_set: frozenset[str], *, canonicalize: bool = True
+    ) -> Tuple[List[Tuple[str, float]], float, float, float, float, str]:
+        """Single pass over the distribution: canonical pairs, weighted (v,a,d) and stress.
+        Returns (pairs, v, a, d, stress, level). neg_set holds lower-cased labels/aliases counted as negative.
+        If canonicalize is False the returned pairs keep the original labels.
+        """
+        n = len(distribution)
+        idxs = np.empty(n, dtype=np.int32)
+        scores = np.empty(n, dtype=np.float32)
+        neg = np.empty(n, dtype=np.bool_)
+        pairs = self._resolve_into(distribution, neg_set, canonicalize, idxs, scores, neg)
+        return (pairs,) + self._score(idxs, scores, neg)
+
+    def _score(self, idxs: np.ndarray, scores: np.ndarray, neg: np.ndarray) -> Tuple[float, float, float, float, str]:
+        """(v, a, d, stress, level) for one resolved distribution; shared by analyze and analyze_batch."""
+        v, a, d, total, neg_sum = _score_kernel(idxs, scores, self._vad_arr, neg)
+        if total <= 0:
+            v, a, d = NEUTRAL_VAD
+        else:
+            v, a, d = float(v / total), float(a / total), float(d / total)
+        stress, level = _stress_score(v, a, neg_sum)
+        return v, a, d, stress, level
+
+    def analyze_batch(
+        self, distributions: List[List[Tuple[str, float]]], neg_set: frozenset[str], *, canonicalize: bool = True
+    ) -> List[Tuple[List[Tuple[str, float]], float, float, float, float, str]]:
+        """Batched analyze(): one set of buffers reused across rows, each row scored by the same kernel
+        as analyze(), so results are identical to calling analyze() per distribution."""
+        if not distributions:
+            return []
+        width = max(len(dist) for dist in distributions)
+        idxs = np.empty(width, dtype=np.int32)
+        scores = np.empty(width, dtype=np.float32)
+        neg = np.empty(width, dtype=np.bool_)
+        res = []
+        for dist in distributions:
+            n = len(dist)
+            pairs = self._resolve_into(dist, neg_set, canonicalize, idxs[:n], scores[:n], neg[:n])
+            res.append((pairs,) + self._score(idxs[:n], scores[:n], neg[:n]))
+        return res
 
     def unknown_labels(self, labels: List[str]) -> List[str]:
-        res: List[str] = []
-        for l in labels:
-            c = self.canonical(l)
-            if c not in self.mapping:
-                res.append(l)
-        return sorted(set(res))
+        resolved = self._resolved
+        return sorted({l for l in labels if _norm(l) not in resolved})
 
 
 _vad_mapper: Optional[VADMapper] = None
 
 
+@dataclass(frozen=True)
+class VADBundle:
+    """Everything the request path needs for one emotion model, resolved from disk once."""
+
+    emotion_model_dir: str
+    labels: Tuple[str, ...]
+    mapper: VADMapper
+    negative: frozenset[str]  # alias-expanded negative labels
+
+
+_bundle: Optional[VADBundle] = None
+
+
 def _load_mapping_from_json(p: Path) -> Dict[str, Tuple[float, float, float]]:
-    data = json.loads(p.read_text(encoding="utf-8"))
+    data = _read_json(p)
     mapping: Dict[str, Tuple[float, float, float]] = {}
     for k, v in data.items():
         if isinstance(v, dict):
@@ -103,9 +246,13 @@ def init_vad_mapper(emotion_model_dir: Path | str, emotion_labels: Optional[List
     """Initialize global VAD mapper from JSON files near the emotion model.
     Priority: model_dir/vad_map.json -> parent/vad_map.json -> app/config/vad_map.json -> app/vad_maps/default.json
     Aliases similarly with label_alias.json. Unknown labels are written to unknown_labels.json next to parent.
+    Calling again with the same model dir and labels is a no-op (config files are read once per model).
     """
-    global _vad_mapper
+    global _vad_mapper, _vad_init_key
     emo_dir = Path(emotion_model_dir)
+    init_key = (str(emo_dir), tuple(str(l) for l in (emotion_labels or ())))
+    if init_key == _vad_init_key and _vad_mapper is not None:
+        return
     global _last_emotion_dir, _vad_status
     _last_emotion_dir = emo_dir
     paths = get_vad_config_paths(emo_dir)
@@ -120,23 +267,28 @@ def init_vad_mapper(emotion_model_dir: Path | str, emotion_labels: Optional[List
         alias: Optional[Dict[str, str]] = None
         if alias_path is not None and alias_path.exists():
             try:
-                alias = json.loads(alias_path.read_text(encoding="utf-8"))
+                alias = _read_json(alias_path)
             except Exception as e:  # noqa: BLE001
                 logger.warning(f"Failed to read alias file {alias_path}: {e}")
         mapper = VADMapper(mapping, alias)
         _vad_mapper = mapper
         logger.info(f"Loaded VAD mapping from {map_path} (alias: {alias_path if alias_path else 'none'})")
+    if _negative_labels is not None:
+        _expand_negative_labels()
+    _vad_init_key = init_key
 
-    # Record unknown labels (always write file for discoverability)
+    # Record unknown labels (file is written for discoverability, skipped when content is unchanged)
+    global _last_written_unknowns
     try:
         unknown_path: Path = paths["unknown"]  # type: ignore[assignment]
         unknowns: List[str] = []
         if emotion_labels is not None and mapper is not None:
             unknowns = mapper.unknown_labels(emotion_labels)
-        unknown_path.write_text(
-            json.dumps({"unknown_labels": unknowns}, ensure_ascii=False, indent=2), encoding="utf-8"
-        )
-        logger.info(f"Wrote unknown emotion labels to {unknown_path} (count={len(unknowns)})")
+        snap = (str(unknown_path), frozenset(unknowns))
+        if snap != _last_written_unknowns:
+            _write_json(unknown_path, {"unknown_labels": unknowns})
+            _last_written_unknowns = snap
+            logger.info(f"Wrote unknown emotion labels to {unknown_path} (count={len(unknowns)})")
         # update status snapshot
         _vad_status.update(
             {
@@ -154,24 +306,34 @@ def init_vad_mapper(emotion_model_dir: Path | str, emotion_labels: Optional[List
 
 def _load_negative_from_file(p: Path) -> Optional[set[str]]:
     try:
-        data = json.loads(p.read_text(encoding="utf-8"))
+        data = _read_json(p)
         labels: set[str] = set()
         if isinstance(data, list):
-            labels = {str(x).lower() for x in data}
+            labels = {_norm(x) for x in data}
         elif isinstance(data, dict):
             # support {"labels": [..]} or {"anger": true, ...}
             if "labels" in data and isinstance(data["labels"], list):
-                labels = {str(x).lower() for x in data["labels"]}
+                labels = {_norm(x) for x in data["labels"]}
             else:
                 for k, v in data.items():
                     if bool(v):
-                        labels.add(str(k).lower())
+                        labels.add(_norm(k))
         return labels
     except Exception as e:  # noqa: BLE001
         logger.warning(f"Failed to parse negative emotions file {p}: {e}")
         return None
 
 
+def _expand_negative_labels() -> None:
+    """Rebuild _negative_labels_expanded from _negative_labels and the current mapper's alias table."""
+    global _negative_labels_expanded
+    neg = _negative_labels or set()
+    canon: Dict[str, str] = _vad_mapper._canon if _vad_mapper is not None else {}
+    _negative_labels_expanded = frozenset(l for l in neg if canon.get(l, l) in neg) | frozenset(
+        a for a, c in canon.items() if c in neg
+    )
+
+
 def init_negative_labels(emotion_model_dir: Path | str, emotion_labels: Optional[List[str]] = None) -> None:
     """Initialize dynamic negative emotion labels.
     Priority: negative_emotions.json (same search strategy as VAD config) -> derive by V<threshold.
@@ -186,6 +348,7 @@ def init_negative_labels(emotion_model_dir: Path | str, emotion_labels: Optional
         loaded = _load_negative_from_file(neg_path)
         if loaded is not None:
             _negative_labels = loaded
+            _expand_negative_labels()
             logger.info(f"Loaded negative emotions from {neg_path} (count={len(_negative_labels)})")
             _vad_status.update(
                 {
@@ -208,6 +371,7 @@ def init_negative_labels(emotion_model_dir: Path | str, emotion_labels: Optional
         if v < threshold:
             derived.add(_vad_mapper.canonical(lbl))  # type: ignore[union-attr]
     _negative_labels = derived
+    _expand_negative_labels()
     logger.info(f"Derived negative emotions by V<{threshold}: count={len(_negative_labels)}")
     _vad_status.update(
         {
@@ -219,6 +383,40 @@ def init_negative_labels(emotion_model_dir: Path | str, emotion_labels: Optional
     )
 
 
+def ensure_bundle(emotion_model_dir: Path | str, emotion_labels: Optional[List[str]] = None) -> VADBundle:
+    """Return the cached VADBundle for this model dir and label set, loading it on first use.
+    Runs init_vad_mapper + init_negative_labels once per (model dir, labels); later calls touch no files.
+    """
+    global _bundle
+    emo_dir = str(Path(emotion_model_dir))
+    labels = tuple(str(l) for l in (emotion_labels or ()))
+    b = _bundle
+    if b is not None and b.emotion_model_dir == emo_dir and b.labels == labels:
+        return b
+    init_vad_mapper(emo_dir, list(labels) or None)
+    init_negative_labels(emo_dir, list(labels) or None)
+    assert _vad_mapper is not None
+    _bundle = VADBundle(
+        emotion_model_dir=emo_dir,
+        labels=labels,
+        mapper=_vad_mapper,
+        negative=_negative_labels_expanded,
+    )
+    return _bundle
+
+
+def _resolve_bundle(bundle: Optional[VADBundle]) -> Tuple[VADMapper, frozenset]:
+    """Mapper and negative set to analyze with: the given bundle, else the module defaults."""
+    if bundle is not None:
+        return bundle.mapper, bundle.negative
+    if _vad_mapper is None:
+        _ensure_default_mapper()
+    if _negative_labels is None:
+        init_negative_labels(emotion_model_dir=PROJECT_ROOT / "models" / "emotion", emotion_labels=None)
+    assert _vad_mapper is not None
+    return _vad_mapper, _negative_labels_expanded
+
+
 def normalize_distribution(pairs: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
     total = sum(max(0.0, s) for _, s in pairs)
     if total <= 0:
@@ -246,39 +444,67 @@ def derive_stress(valence: float, arousal: float, distribution: List[Tuple[str,
     if _negative_labels is None:
         # Try to derive without labels list
         init_negative_labels(emotion_model_dir=PROJECT_ROOT / "models" / "emotion", emotion_labels=None)
+    norm = _norm
+    neg = _negative_labels_expanded
     neg_sum = 0.0
     for label, score in distribution:
-        lab = str(label)
-        canon = _vad_mapper.canonical(lab) if _vad_mapper else lab.lower()
-        if _negative_labels and canon in _negative_labels:
+        if norm(label) in neg:
             neg_sum += score
+    return _stress_score(valence, arousal, neg_sum)
+
+
+def _stress_score(valence: float, arousal: float, neg_sum: float) -> Tuple[float, str]:
     stress = 0.6 * (1.0 - valence) + 0.4 * arousal + 0.15 * neg_sum
     stress = max(0.0, min(1.0, stress))
+    return stress, _stress_level(stress)
+
+
+def _stress_level(stress: float) -> str:
     if stress < 0.33:
-        level = "low"
-    elif stress < 0.66:
-        level = "medium"
-    else:
-        level = "high"
-    return stress, level
+        return "low"
+    if stress < 0.66:
+        return "medium"
+    return "high"
+
+
+def analyze_distribution(
+    distribution: List[Tuple[str, float]], *, canonicalize: bool = True, bundle: Optional[VADBundle] = None
+) -> Tuple[List[Tuple[str, float]], float, float, float, float, str]:
+    """一次遍历完成标签规范化、VAD 映射与压力推导（等价于 canonicalize_distribution + emotions_to_vad + derive_stress）。
+    返回 (pairs, v, a, d, stress, level)；canonicalize=False 时 pairs 保留原始标签。
+    bundle 为 ensure_bundle() 的结果；省略时使用模块当前的映射与负向标签集。
+    """
+    mapper, negative = _resolve_bundle(bundle)
+    return mapper.analyze(distribution, negative, canonicalize=canonicalize)
+
+
+def analyze_distribution_batch(
+    distributions: List[List[Tuple[str, float]]], *, canonicalize: bool = True, bundle: Optional[VADBundle] = None
+) -> List[Tuple[List[Tuple[str, float]], float, float, float, float, str]]:
+    """analyze_distribution 的批量版本：多条分布补齐为二维数组后一次性向量化计算。"""
+    mapper, negative = _resolve_bundle(bundle)
+    return mapper.analyze_batch(distributions, negative, canonicalize=canonicalize)
 
 
 def get_vad_status() -> Dict[str, Any]:
     """Return snapshot of current VAD/negative labels status.
     If not initialized yet, ensure default mapper, and return current snapshot.
     """
-    global _vad_mapper, _vad_status, _last_emotion_dir
+    global _vad_mapper, _vad_status, _last_emotion_dir, _unknown_mtime_key
     if _vad_mapper is None:
         _ensure_default_mapper()
-    # enrich unknown labels from file if exists
+    # enrich unknown labels from file if exists (re-parsed only when its mtime changes)
     try:
         upath = _vad_status.get("unknown_labels_path")
-        if upath and Path(upath).exists():
-            data = json.loads(Path(upath).read_text(encoding="utf-8"))
-            u = data.get("unknown_labels", [])
-            if isinstance(u, list):
-                _vad_status["unknown_labels"] = [str(x) for x in u]
-                _vad_status["unknown_labels_count"] = len(_vad_status["unknown_labels"])
+        if upath:
+            key = (str(upath), Path(upath).stat().st_mtime)
+            if key != _unknown_mtime_key:
+                data = _read_json(Path(upath))
+                u = data.get("unknown_labels", [])
+                if isinstance(u, list):
+                    _vad_status["unknown_labels"] = [str(x) for x in u]
+                    _vad_status["unknown_labels_count"] = len(_vad_status["unknown_labels"])
+                _unknown_mtime_key = key
     except Exception:
         pass
     # attach last emotion dir explicitly
@@ -292,11 +518,13 @@ def canonicalize_distribution(distribution: List[Tuple[str, float]]) -> List[Tup
     global _vad_mapper
     if _vad_mapper is None:
         _ensure_default_mapper()
+    norm = _norm
+    if _vad_mapper is None or not _vad_mapper._has_aliases:
+        return [(norm(lbl), float(score)) for lbl, score in distribution]
+    canon_get = _vad_mapper._canon.get
     res: List[Tuple[str, float]] = []
+    append = res.append
     for lbl, score in distribution:
-        try:
-            canon = _vad_mapper.canonical(lbl) if _vad_mapper else str(lbl).lower()
-        except Exception:
-            canon = str(lbl)
-        res.append((canon, float(score)))
+        l = norm(lbl)
+        append((canon_get(l, l), float(score)))
     return res
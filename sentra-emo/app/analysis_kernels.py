@@ -0,0 +1,63 @@
+"""Numeric kernels for emotion-distribution scoring.
+
+Compiled with numba when it is installed; otherwise an equivalent NumPy
+implementation is used. Both return un-normalized sums so the caller keeps
+control of the neutral fallback for empty/zero distributions.
+"""
+import time
+from typing import Tuple
+
+import numpy as np
+
+try:  # optional JIT
+    from numba import njit  # type: ignore
+except Exception:  # noqa: BLE001
+    njit = None  # type: ignore[assignment]
+
+
+def _score_numpy(idxs: np.ndarray, scores: np.ndarray, vad: np.ndarray, neg: np.ndarray) -> Tuple[float, float, float, float, float]:
+    # float32 products accumulated in float64, like the numba kernel
+    v, a, d = (scores[:, None] * vad[idxs]).sum(axis=0, dtype=np.float64)
+    s64 = scores.astype(np.float64)
+    return float(v), float(a), float(d), float(s64.sum()), float(s64[neg].sum())
+
+
+if njit is not None:
+
+    @njit(cache=True, fastmath=True)
+    def _score_numba(idxs, scores, vad, neg):  # pragma: no cover - exercised only with numba installed
+        v = a = d = total = neg_sum = 0.0
+        for i in range(idxs.shape[0]):
+            s = scores[i]
+            r = idxs[i]
+            v += s * vad[r, 0]
+            a += s * vad[r, 1]
+            d += s * vad[r, 2]
+            total += s
+            if neg[i]:
+                neg_sum += s
+        return v, a, d, total, neg_sum
+
+    score = _score_numba
+else:
+    score = _score_numpy
+
+HAS_NUMBA = njit is not None
+
+
+def warmup() -> float:
+    """Compile (or load from cache) the numba kernel with the dtypes VADMapper.analyze passes, so the
+    first request does not pay the JIT. Returns elapsed ms; no-op without numba."""
+    if not HAS_NUMBA:
+        return 0.0
+    t0 = time.perf_counter()
+    score(
+        np.zeros(1, dtype=np.int32),
+        np.zeros(1, dtype=np.float32),
+        np.zeros((1, 3), dtype=np.float32),
+        np.zeros(1, dtype=np.bool_),
+    )
+    return (time.perf_counter() - t0) * 1000.0
+
+
+__all__ = ["score", "HAS_NUMBA", "warmup"]
@@ -0,0 +1,104 @@
+"""Async micro-batching: coalesce concurrent single-text requests into one batched model call."""
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class BatchedInferencer(Generic[T]):
+    """Queue texts from concurrent requests and run them through batch_fn together.
+
+    A background task (started lazily on the running loop) takes the first queued text, then keeps
+    collecting until max_batch items or max_wait_ms have elapsed, and runs batch_fn(texts) in
+    executor (default: the loop's default executor) so the event loop is never blocked by inference.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[str]], List[T]],
+        *,
+        max_batch: int = 16,
+        max_wait_ms: float = 5.0,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self._batch_fn = batch_fn
+        self._executor = executor
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue: Optional["asyncio.Queue[Tuple[str, asyncio.Future]]"] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, text: str) -> T:
+        self._ensure_worker()
+        assert self._queue is not None and self._loop is not None
+        fut: asyncio.Future = self._loop.create_future()
+        await self._queue.put((text, fut))
+        return await fut
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            texts = [t for t, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self._batch_fn, texts)
+            except Exception as e:  # noqa: BLE001
+                if len(batch) == 1:
+                    self._settle(batch[0][1], exc=e)
+                    continue
+                # 单条文本出错不能拖垮同批其他请求：逐条重试，只让仍然失败的请求报错
+                logger.warning(f"Batched inference failed for {len(texts)} texts, retrying one by one: {e}")
+                for text, fut in batch:
+                    try:
+                        (res,) = await loop.run_in_executor(self._executor, self._batch_fn, [text])
+                    except Exception as e1:  # noqa: BLE001
+                        self._settle(fut, exc=e1)
+                    else:
+                        self._settle(fut, res)
+                continue
+            for (_, fut), res in zip(batch, results):
+                self._settle(fut, res)
+
+    @staticmethod
+    def _settle(fut: asyncio.Future, res=None, *, exc: Optional[BaseException] = None) -> None:
+        if fut.done():  # caller went away (cancelled)
+            return
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(res)
+
+    async def aclose(self) -> None:
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
@@ -14,6 +14,40 @@ def get_host_port() -> tuple[str, int]:
     return host, port
 
 
+def is_production() -> bool:
+    """SENTRA_ENV=prod|production switches run.py to the multi-worker launcher (no reload). Default: dev."""
+    return os.getenv("SENTRA_ENV", "dev").strip().lower() in {"prod", "production"}
+
+
+def get_worker_count() -> int:
+    """Uvicorn worker processes in production. Env: SENTRA_WORKERS (default: CPU count).
+    Each worker loads its own copy of both models.
+    """
+    try:
+        return max(1, int(os.getenv("SENTRA_WORKERS", "") or (os.cpu_count() or 1)))
+    except Exception:
+        return 1
+
+
+# sentiment and emotion forward passes run concurrently on this many inference threads per worker
+INFERENCE_CONCURRENCY = 2
+
+
+def get_num_threads() -> int:
+    """Intra-op threads per model forward pass (torch / OpenMP / MKL / ONNX Runtime).
+    Both models run at once, so a worker uses INFERENCE_CONCURRENCY times this many threads.
+    Env: SENTRA_NUM_THREADS; default: CPU count / (workers in production, else 1) / INFERENCE_CONCURRENCY.
+    """
+    try:
+        v = int(os.getenv("SENTRA_NUM_THREADS", "0"))
+        if v > 0:
+            return v
+    except Exception:
+        pass
+    workers = get_worker_count() if is_production() else 1
+    return max(1, (os.cpu_count() or 1) // (workers * INFERENCE_CONCURRENCY))
+
+
 def get_pipeline_device_index() -> int:
     """Return device index for transformers.pipeline: -1 for CPU, 0.. for CUDA index.
     Primary config:
@@ -242,6 +276,95 @@ def get_sentiment_neutral_mode() -> str:
         return v
     return "auto"
 
+def get_inference_backend() -> str:
+    """Inference backend for the classification models: torch|onnx|openvino|trt.
+    onnx exports via optimum.onnxruntime on first load and caches the graph under <model_dir>/onnx.
+    openvino exports via optimum.intel and caches the IR under <model_dir>/openvino.
+    trt runs the cached ONNX graph on ONNX Runtime's TensorRT EP (CUDA only), engines cached in <model_dir>/trt_cache.
+    Default: torch
+    """
+    v = os.getenv("SENTRA_BACKEND", "torch").strip().lower()
+    if v in {"torch", "onnx", "openvino", "trt"}:
+        return v
+    return "torch"
+
+
+def get_quantize_mode() -> str:
+    """Weight quantization for the classification models: none|int8.
+    int8 -> dynamic INT8 quantization of Linear layers (torch, CPU only) or an avx512_vnni
+    dynamic-quantized graph cached as <model_dir>/onnx/model_quantized.onnx (onnx backend).
+    Default: none
+    """
+    v = os.getenv("SENTRA_QUANTIZE", "none").strip().lower()
+    if v in {"none", "int8"}:
+        return v
+    return "none"
+
+
+def get_torch_optimize_mode() -> str:
+    """Fused-attention/compile optimization for torch models: off|bettertransformer|compile|auto.
+    auto tries BetterTransformer first and falls back to torch.compile.
+    Default: off (transformers already uses SDPA attention for most encoders)
+    """
+    v = os.getenv("SENTRA_TORCH_OPTIMIZE", "off").strip().lower()
+    if v in {"off", "bettertransformer", "compile", "auto"}:
+        return v
+    return "off"
+
+
+def get_gpu_dtype() -> str:
+    """Weight dtype for the torch backend on CUDA: auto|bf16|fp16|fp32.
+    auto -> bf16 when the GPU supports it, else fp16. CPU always stays fp32.
+    Env: SENTRA_GPU_DTYPE (default: auto)
+    """
+    v = os.getenv("SENTRA_GPU_DTYPE", "auto").strip().lower()
+    if v in {"auto", "bf16", "fp16", "fp32"}:
+        return v
+    return "auto"
+
+
+def get_inference_cache_size() -> int:
+    """Per-model LRU size for raw inference results keyed by text (0 disables). Default: 4096."""
+    try:
+        return max(0, int(os.getenv("SENTRA_INFER_CACHE_SIZE", "4096")))
+    except Exception:
+        return 4096
+
+
+def get_batch_max_size() -> int:
+    """Max texts coalesced into one forward pass by the async micro-batcher (<=1 disables). Default: 16."""
+    try:
+        return int(os.getenv("SENTRA_BATCH_MAX", "16"))
+    except Exception:
+        return 16
+
+
+def get_batch_max_wait_ms() -> float:
+    """How long the micro-batcher waits for more requests after the first one (ms). Default: 5."""
+    try:
+        return float(os.getenv("SENTRA_BATCH_WAIT_MS", "5"))
+    except Exception:
+        return 5.0
+
+
+def get_max_seq_length() -> int:
+    """Token truncation length for the direct (non-pipeline) inference path.
+    Env: SENTRA_MAX_LENGTH (default: 512; capped by the tokenizer's model_max_length).
+    """
+    try:
+        return max(8, int(os.getenv("SENTRA_MAX_LENGTH", "512")))
+    except Exception:
+        return 512
+
+
+def prefer_small_models() -> bool:
+    """Rank local candidates by encoder size (num_hidden_layers * hidden_size, smallest first).
+    Env: SENTRA_PREFER_SMALL (default: false). priority.txt and SENTRA_*_MODEL selectors still win.
+    """
+    v = os.getenv("SENTRA_PREFER_SMALL", "false").strip().lower()
+    return v in {"1", "true", "yes", "on"}
+
+
 def use_emotion_label_alias() -> bool:
     """Whether to use label alias mapping for emotion labels.
     Default: true (use alias mapping from label_alias.json)
@@ -1,83 +1,103 @@
+import asyncio
 import logging
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import time
-from typing import List, Optional
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
 
 from .schemas import AnalyzeRequest, AnalyzeResponse, LabelScore, SentimentResult, VADResult, PADResult, StressResult, BatchAnalyzeRequest, UserState
 from .models import ModelManager
-from .analysis import emotions_to_vad, derive_stress, init_vad_mapper, get_vad_status, canonicalize_distribution
-from .config import get_device_report, use_emotion_label_alias
+from .analysis import analyze_distribution, analyze_distribution_batch, ensure_bundle, get_vad_status
+from .analysis_kernels import HAS_NUMBA, warmup as warmup_scoring_kernel
+from .config import get_device_report, get_num_threads, use_emotion_label_alias
 from .user_store import get_store
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+try:
+    import torch  # type: ignore
+
+    # 纯推理服务：关闭梯度（线程局部，推理线程内另由 inference_mode / pipeline 的 no_grad 保证）
+    torch.set_grad_enabled(False)
+except ImportError:  # onnx/openvino-only deployments
+    pass
+
 models = ModelManager()
 
+_TOP1_CAP = 2000
+
 _metrics = {
     "start_time": time.perf_counter(),
-    "inference_latencies_ms": [],  # type: List[float]
+    "inference_latencies_ms": deque(maxlen=2000),  # type: deque[float]
     "inference_count": 0,
     "error_count": 0,
-    "emotion_top1_scores": [],  # type: List[float]
-    "emotion_top1_times": [],  # type: List[float]
+    # ring buffers (capacity _TOP1_CAP); emotion_top1_len valid slots, emotion_top1_idx next write position
+    "emotion_top1_scores": np.zeros(_TOP1_CAP, dtype=np.float32),
+    "emotion_top1_times": np.zeros(_TOP1_CAP, dtype=np.float64),
+    "emotion_top1_idx": 0,
+    "emotion_top1_len": 0,
 }
 
 
 def _record_latency_ms(ms: float) -> None:
     _metrics["inference_count"] += 1
-    buf: List[float] = _metrics["inference_latencies_ms"]
-    buf.append(float(ms))
-    # cap buffer size to avoid unbounded growth
-    if len(buf) > 2000:
-        del buf[: len(buf) - 1000]
+    # bounded deque: oldest samples are evicted in O(1)
+    _metrics["inference_latencies_ms"].append(float(ms))
 
 
-def _percentile(values: List[float], q: float):
-    if not values:
-        return None
-    s = sorted(values)
-    n = len(s)
-    idx = int(q * (n - 1))
-    idx = max(0, min(idx, n - 1))
-    return float(s[idx])
+def _percentiles(values: Iterable[float], qs: Sequence[float]) -> Dict[float, Optional[float]]:
+    """Nearest-rank percentiles (index int(q*(n-1))) for several q at once via a single np.partition."""
+    arr = values if isinstance(values, np.ndarray) else np.fromiter(values, dtype=np.float64)
+    n = arr.size
+    if n == 0:
+        return {q: None for q in qs}
+    idxs = [max(0, min(int(q * (n - 1)), n - 1)) for q in qs]
+    part = np.partition(arr, sorted(set(idxs)))
+    return {q: float(part[i]) for q, i in zip(qs, idxs)}
 
 
 def _record_emotion_top1(score: float) -> None:
-    _metrics["emotion_top1_scores"].append(float(score))
-    _metrics["emotion_top1_times"].append(float(time.perf_counter()))
-    if len(_metrics["emotion_top1_scores"]) > 2000:
-        del _metrics["emotion_top1_scores"][: len(_metrics["emotion_top1_scores"]) - 1000]
-        del _metrics["emotion_top1_times"][: len(_metrics["emotion_top1_times"]) - 1000]
+    i = _metrics["emotion_top1_idx"]
+    _metrics["emotion_top1_scores"][i] = score
+    _metrics["emotion_top1_times"][i] = time.perf_counter()
+    _metrics["emotion_top1_idx"] = (i + 1) % _TOP1_CAP
+    _metrics["emotion_top1_len"] = min(_metrics["emotion_top1_len"] + 1, _TOP1_CAP)
+
+
+def _configure_torch_threads() -> None:
+    """Pin torch intra-op threads to this worker's share of the CPU; inter-op parallelism is not used."""
+    try:
+        import torch  # type: ignore
+    except ImportError:
+        return
+    n = get_num_threads()
+    torch.set_num_threads(n)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:  # only settable before the first parallel op
+        pass
+    logger.info("torch threads: intra_op=%d inter_op=%d", torch.get_num_threads(), torch.get_num_interop_threads())
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    try:
-        emo_pipe, emo_mid = models.ensure_emotion()
-        labels = []
-        try:
-            id2label = getattr(emo_pipe.model.config, "id2label", None)
-            if isinstance(id2label, dict) and id2label:
-                numeric_keys = [k for k in id2label.keys() if isinstance(k, int) or (isinstance(k, str) and str(k).isdigit())]
-                if numeric_keys:
-                    idxs = sorted([int(k) for k in id2label.keys()])
-                    labels = [str(id2label[i]) for i in idxs]
-                else:
-                    labels = [str(v) for v in id2label.values()]
-        except Exception:
-            labels = []
-        init_vad_mapper(emo_mid, labels if labels else None)
-    except Exception as e:  # noqa: BLE001
-        logger.warning(f"Startup VAD init skipped: {e}")
+    _configure_torch_threads()
+    models.preload_models()
+    if HAS_NUMBA:
+        logger.info("Scoring kernel compiled in %.1f ms", warmup_scoring_kernel())
 
     try:
-        models.ensure_sentiment()
+        _, emo_mid = models.ensure_emotion()
+        labels = models.emotion_labels()
+        ensure_bundle(emo_mid, list(labels) or None)
     except Exception as e:  # noqa: BLE001
-        logger.warning(f"Startup sentiment preload skipped: {e}")
+        logger.warning(f"Startup VAD init skipped: {e}")
 
     # Log device report once at startup
     try:
@@ -96,7 +116,8 @@ async def lifespan(app: FastAPI):
         pass
 
     yield
-    # Teardown (nothing for now)
+    # Teardown
+    await models.aclose()
 
 
 app = FastAPI(title="Sentra Emo: 文本情绪/情感/VAD/PAD/压力分析", lifespan=lifespan)
@@ -124,31 +145,14 @@ async def analyze(req: AnalyzeRequest):
     try:
         # Local backend flow only
         # Ensure emotion model is ready and initialize VAD mapper dynamically using its labels
-        emo_pipe, emo_mid = models.ensure_emotion()
-        labels = []
-        try:
-            id2label = getattr(emo_pipe.model.config, "id2label", None)
-            if isinstance(id2label, dict) and id2label:
-                # Try to preserve order 0..N-1 if numeric keys
-                numeric_keys = [k for k in id2label.keys() if isinstance(k, int) or (isinstance(k, str) and str(k).isdigit())]
-                if numeric_keys:
-                    # sort by numeric
-                    idxs = sorted([int(k) for k in id2label.keys()])
-                    labels = [str(id2label[i]) for i in idxs]
-                else:
-                    labels = [str(v) for v in id2label.values()]
-        except Exception:
-            labels = []
-        init_vad_mapper(emo_mid, labels if labels else None)
-
-        sentiment = models.analyze_sentiment(text)
-        emotions_pairs = models.analyze_emotions(text)
-        if use_emotion_label_alias():
-            canon_pairs = canonicalize_distribution(emotions_pairs)
-        else:
-            canon_pairs = emotions_pairs
-        v, a, d = emotions_to_vad(canon_pairs)
-        stress, level = derive_stress(v, a, canon_pairs)
+        _, emo_mid = models.ensure_emotion()
+        labels = models.emotion_labels()
+        bundle = ensure_bundle(emo_mid, list(labels) or None)
+
+        sentiment, emotions_pairs = await models.analyze_async(text)
+        canon_pairs, v, a, d, stress, level = analyze_distribution(
+            emotions_pairs, canonicalize=use_emotion_label_alias(), bundle=bundle
+        )
 
         user_state: Optional[UserState] = None
         if (req.userid or "").strip():
@@ -220,20 +224,9 @@ async def analyze_batch(req: BatchAnalyzeRequest):
 
     # Preload models and initialize VAD mapper once
     try:
-        emo_pipe, emo_mid = models.ensure_emotion()
-        labels = []
-        try:
-            id2label = getattr(emo_pipe.model.config, "id2label", None)
-            if isinstance(id2label, dict) and id2label:
-                numeric_keys = [k for k in id2label.keys() if isinstance(k, int) or (isinstance(k, str) and str(k).isdigit())]
-                if numeric_keys:
-                    idxs = sorted([int(k) for k in id2label.keys()])
-                    labels = [str(id2label[i]) for i in idxs]
-                else:
-                    labels = [str(v) for v in id2label.values()]
-        except Exception:
-            labels = []
-        init_vad_mapper(emo_mid, labels if labels else None)
+        _, emo_mid = models.ensure_emotion()
+        labels = models.emotion_labels()
+        bundle = ensure_bundle(emo_mid, list(labels) or None)
     except Exception as e:  # noqa: BLE001
         logger.exception("Batch startup VAD init failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -246,18 +239,33 @@ async def analyze_batch(req: BatchAnalyzeRequest):
 
     results: List[AnalyzeResponse] = []
     use_alias = use_emotion_label_alias()
-    for text in texts:
+    # One batched forward pass per model, then one vectorized VAD/stress pass over all distributions
+    t0 = time.perf_counter()
+    try:
+        # inference runs on the shared inference threads so the event loop stays responsive
+        loop = asyncio.get_running_loop()
+        executor = models._infer_executor()
+        sentiments, analyzed = await asyncio.gather(
+            loop.run_in_executor(executor, models.analyze_sentiment_batch, texts),
+            loop.run_in_executor(
+                executor,
+                lambda: analyze_distribution_batch(
+                    models.analyze_emotions_batch(texts), canonicalize=use_alias, bundle=bundle
+                ),
+            ),
+        )
+    except Exception as e:  # noqa: BLE001
+        dt_ms = (time.perf_counter() - t0) * 1000.0
+        _record_latency_ms(dt_ms)
+        _metrics["error_count"] += 1
+        logger.exception("Analyze(batch) inference error in %.1f ms: %s", dt_ms, e)
+        raise HTTPException(status_code=500, detail=str(e))
+    # amortized per-text share of the batched inference
+    infer_ms = (time.perf_counter() - t0) * 1000.0 / len(texts)
+
+    for text, sentiment, (canon_pairs, v, a, d, stress, level) in zip(texts, sentiments, analyzed):
         t0 = time.perf_counter()
         try:
-            sentiment = models.analyze_sentiment(text)
-            emotions_pairs = models.analyze_emotions(text)
-            if use_alias:
-                canon_pairs = canonicalize_distribution(emotions_pairs)
-            else:
-                canon_pairs = emotions_pairs
-            v, a, d = emotions_to_vad(canon_pairs)
-            stress, level = derive_stress(v, a, canon_pairs)
-
             user_state: Optional[UserState] = None
             if (getattr(req, "userid", None) or "").strip():
                 try:
@@ -285,7 +293,7 @@ async def analyze_batch(req: BatchAnalyzeRequest):
                 },
                 user=user_state,
             )
-            dt_ms = (time.perf_counter() - t0) * 1000.0
+            dt_ms = infer_ms + (time.perf_counter() - t0) * 1000.0
             _record_latency_ms(dt_ms)
             try:
                 if canon_pairs:
@@ -299,7 +307,7 @@ async def analyze_batch(req: BatchAnalyzeRequest):
             )
             results.append(resp)
         except Exception as e:  # noqa: BLE001
-            dt_ms = (time.perf_counter() - t0) * 1000.0
+            dt_ms = infer_ms + (time.perf_counter() - t0) * 1000.0
             _record_latency_ms(dt_ms)
             _metrics["error_count"] += 1
             logger.exception("Analyze(batch) error in %.1f ms: %s", dt_ms, e)
@@ -356,35 +364,36 @@ async def models_status():
 async def metrics():
     lat = _metrics["inference_latencies_ms"]
     avg = (sum(lat) / len(lat)) if lat else None
-    es = _metrics["emotion_top1_scores"]
-    et = _metrics["emotion_top1_times"]
+    n_top1 = _metrics["emotion_top1_len"]
+    es = _metrics["emotion_top1_scores"][:n_top1]
+    et = _metrics["emotion_top1_times"][:n_top1]
     now = float(time.perf_counter())
-    def _recent(vals: List[float], times: List[float], window_sec: float):
-        if not vals or not times:
-            return {"avg": None, "p50": None, "p95": None, "p99": None, "count": 0}
-        sel = [v for v, t in zip(vals, times) if (now - t) <= window_sec]
-        if not sel:
+    def _recent(vals: np.ndarray, times: np.ndarray, window_sec: float):
+        sel = vals[(now - times) <= window_sec]
+        if not sel.size:
             return {"avg": None, "p50": None, "p95": None, "p99": None, "count": 0}
-        a = sum(sel) / len(sel)
-        return {"avg": float(a), "p50": _percentile(sel, 0.50), "p95": _percentile(sel, 0.95), "p99": _percentile(sel, 0.99), "count": len(sel)}
+        pq = _percentiles(sel, (0.50, 0.95, 0.99))
+        return {"avg": float(sel.mean()), "p50": pq[0.50], "p95": pq[0.95], "p99": pq[0.99], "count": int(sel.size)}
+    lat_pq = _percentiles(lat, (0.50, 0.95, 0.99))
+    es_pq = _percentiles(es, (0.50, 0.95, 0.99))
     return {
         "uptime_sec": (time.perf_counter() - _metrics["start_time"]),
         "inference_count": _metrics["inference_count"],
         "error_count": _metrics["error_count"],
         "inference_latency_ms": {
             "avg": float(avg) if avg is not None else None,
-            "p50": _percentile(lat, 0.50),
-            "p95": _percentile(lat, 0.95),
-            "p99": _percentile(lat, 0.99),
+            "p50": lat_pq[0.50],
+            "p95": lat_pq[0.95],
+            "p99": lat_pq[0.99],
         },
         "model_load_sec": models.get_status(),
         "device": get_device_report(),
         "emotion_top1_score": {
-            "avg": (sum(es) / len(es)) if es else None,
-            "p50": _percentile(es, 0.50),
-            "p95": _percentile(es, 0.95),
-            "p99": _percentile(es, 0.99),
-            "count": len(es),
+            "avg": float(es.mean()) if n_top1 else None,
+            "p50": es_pq[0.50],
+            "p95": es_pq[0.95],
+            "p99": es_pq[0.99],
+            "count": n_top1,
         },
         "emotion_top1_score_recent": {
             "60s": _recent(es, et, 60.0),
@@ -1,8 +1,17 @@
+import asyncio
+import importlib.util
+import json
 import logging
 from typing import Dict, List, Tuple, Optional, Any
 import os
 from pathlib import Path
+import threading
 import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 from transformers import (
     AutoTokenizer,
@@ -17,17 +26,200 @@ from .config import (
     get_emotion_threshold,
     get_emotion_topk,
     get_sentiment_neutral_mode,
+    get_inference_backend,
+    get_quantize_mode,
+    get_torch_optimize_mode,
+    get_inference_cache_size,
+    get_batch_max_size,
+    get_batch_max_wait_ms,
+    prefer_small_models,
+    get_max_seq_length,
+    get_gpu_dtype,
+    get_num_threads,
+    INFERENCE_CONCURRENCY,
 )
+from .batching import BatchedInferencer
 
 logger = logging.getLogger(__name__)
 
+RawPairs = Tuple[Tuple[str, float], ...]
+
+_HAS_ACCELERATE = importlib.util.find_spec("accelerate") is not None
+
+
+_NLPTOWN_PREFIX = "nlptown/bert-base-multilingual-uncased-sentiment"
+
+
+def _sentiment_bucket(label: str) -> str:
+    """Map a sentiment model label to positive|negative|neutral|unknown by substring."""
+    l = str(label).strip().lower()
+    if "pos" in l:
+        return "positive"
+    if "neg" in l:
+        return "negative"
+    if "neu" in l:
+        return "neutral"
+    return "unknown"
+
+
+def _star_of(label: str) -> Optional[int]:
+    """nlptown label like "1 star" / "5 stars" -> 1..5."""
+    try:
+        return int(str(label).split()[0])
+    except Exception:
+        return None
+
+
+# nlptown 星级 -> 三类桶：0=negative 1=neutral 2=positive（-1 忽略）
+_STAR_BUCKET = {1: 0, 2: 0, 3: 1, 4: 2, 5: 2}
+
+
+def _star_bucket(label: str) -> int:
+    star = _star_of(label)
+    return _STAR_BUCKET.get(star, -1) if star is not None else -1
+
+
+class _RawScoreCache:
+    """Thread-safe LRU of text -> raw (label, score) pairs for one loaded model."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = max(0, int(maxsize))
+        self._data: "OrderedDict[str, RawPairs]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[RawPairs]:
+        if not self.maxsize:
+            return None
+        with self._lock:
+            hit = self._data.get(text)
+            if hit is not None:
+                self._data.move_to_end(text)
+            return hit
+
+    def put(self, text: str, pairs: RawPairs) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[text] = pairs
+            self._data.move_to_end(text)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+class _FastClassifier:
+    """Calls tokenizer + model directly under torch.inference_mode, skipping the pipeline's per-call
+    pre/post-processing. Returns raw (label, prob) pairs in label-index order, like pipeline(top_k=None)."""
+
+    def __init__(self, pipe: TextClassificationPipeline, labels: Tuple[str, ...], *, multilabel: bool) -> None:
+        import torch  # type: ignore
+
+        self._torch = torch
+        self.tok = pipe.tokenizer
+        self.mdl = pipe.model
+        self.labels = tuple(str(l).strip() for l in labels)
+        cfg = self.mdl.config
+        # same activation choice as the pipeline: sigmoid for multi-label / single-logit heads
+        self.sigmoid = (
+            multilabel
+            or getattr(cfg, "num_labels", 0) == 1
+            or getattr(cfg, "problem_type", None) == "multi_label_classification"
+        )
+        tok_max = getattr(self.tok, "model_max_length", None) or 0
+        self.max_length = min(get_max_seq_length(), tok_max) if 0 < tok_max < 1_000_000 else get_max_seq_length()
+        dev = getattr(self.mdl, "device", None)
+        self.device = dev if isinstance(dev, torch.device) else None
+        # half-precision CUDA weights run under autocast; everything else in its native dtype
+        dtype = getattr(self.mdl, "dtype", None)
+        on_cuda = self.device is not None and self.device.type == "cuda"
+        self.autocast_dtype = dtype if on_cuda and dtype in (torch.float16, torch.bfloat16) else None
+        # one stream per model so sentiment and emotion kernels can overlap on the GPU
+        self.stream = torch.cuda.Stream(device=self.device) if on_cuda else None
+        if self.stream is not None:
+            # weights were copied non_blocking on the loading thread's stream; order our forward passes after it
+            self.stream.wait_stream(torch.cuda.current_stream(self.device))
+        self.backend = self._init_backend_tokenizer()
+        self.enabled = bool(self.labels)
+
+    def _init_backend_tokenizer(self):
+        """Private copy of the Rust tokenizer with truncation/padding configured once (the copy keeps
+        the shared HF tokenizer untouched for the pipeline fallback). None -> use the HF tokenizer call."""
+        bk = getattr(self.tok, "backend_tokenizer", None)
+        pad_id = getattr(self.tok, "pad_token_id", None)
+        if bk is None or pad_id is None:
+            return None
+        try:
+            from tokenizers import Tokenizer  # type: ignore
+
+            bk = Tokenizer.from_str(bk.to_str())
+            bk.enable_truncation(
+                max_length=self.max_length, direction=getattr(self.tok, "truncation_side", "right") or "right"
+            )
+            bk.enable_padding(
+                direction=getattr(self.tok, "padding_side", "right") or "right",
+                pad_id=pad_id,
+                pad_token=str(self.tok.pad_token),
+                pad_type_id=getattr(self.tok, "pad_token_type_id", 0) or 0,
+            )
+        except Exception as e:  # noqa: BLE001
+            logger.info(f"Rust tokenizer fast path unavailable: {e}")
+            return None
+        self.with_type_ids = "token_type_ids" in getattr(self.tok, "model_input_names", ())
+        return bk
+
+    def _encode(self, texts: List[str]) -> Dict[str, Any]:
+        if self.backend is None:
+            return dict(self.tok(texts, return_tensors="pt", truncation=True, padding=True, max_length=self.max_length))
+        torch = self._torch
+        encs = self.backend.encode_batch(texts)
+        inputs = {
+            "input_ids": torch.from_numpy(np.array([e.ids for e in encs], dtype=np.int64)),
+            "attention_mask": torch.from_numpy(np.array([e.attention_mask for e in encs], dtype=np.int64)),
+        }
+        if self.with_type_ids:
+            inputs["token_type_ids"] = torch.from_numpy(np.array([e.type_ids for e in encs], dtype=np.int64))
+        return inputs
+
+    def __call__(self, texts: List[str]) -> List[RawPairs]:
+        torch = self._torch
+        enc = self._encode(texts)
+        with torch.inference_mode(), (torch.cuda.stream(self.stream) if self.stream is not None else nullcontext()):
+            # inputs are copied on the model's own stream so the forward pass is ordered after them
+            if self.device is not None:
+                enc = {k: v.to(self.device, non_blocking=True) for k, v in enc.items()}
+            if self.autocast_dtype is not None:
+                with torch.autocast("cuda", dtype=self.autocast_dtype):
+                    logits = self.mdl(**enc).logits
+            else:
+                logits = self.mdl(**enc).logits
+            logits = logits.float()
+            probs = torch.sigmoid(logits) if self.sigmoid else torch.softmax(logits, dim=-1)
+            rows = probs.cpu().tolist()
+        return [tuple(zip(self.labels, row)) for row in rows]
+
 
 class ModelManager:
     def __init__(self) -> None:
         self._sentiment_pipe: Optional[TextClassificationPipeline] = None
         self._sentiment_model_id: Optional[str] = None
+        # per-label post-processing tables, computed once at sentiment model load
+        self._sentiment_label_bucket: Dict[str, str] = {}
+        self._sentiment_has_neutral: bool = False
+        self._sentiment_star_bucket: Optional[Dict[str, int]] = None
         self._emotion_pipe: Optional[TextClassificationPipeline] = None
         self._emotion_model_id: Optional[str] = None
+        self._emotion_labels: Tuple[str, ...] = ()
+        # direct tokenizer+model inference; None -> pipeline path
+        self._sentiment_fast: Optional[_FastClassifier] = None
+        self._emotion_fast: Optional[_FastClassifier] = None
+        self._preload_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._preloaded = False
+        # raw inference caches, recreated whenever a model is (re)loaded
+        self._sentiment_cache = _RawScoreCache(0)
+        self._emotion_cache = _RawScoreCache(0)
+        # async micro-batchers (created on first async call)
+        self._sentiment_batcher: Optional[BatchedInferencer[Dict]] = None
+        self._emotion_batcher: Optional[BatchedInferencer[List[Tuple[str, float]]]] = None
         # discovery and telemetry
         self._sentiment_candidates: List[str] = []
         self._emotion_candidates: List[str] = []
@@ -40,6 +232,7 @@ class ModelManager:
         - If ./models/<kind>/ has config.json directly, use that directory as a candidate.
         - Else, enumerate subdirectories containing either config.json or model weights (pytorch_model.bin/model.safetensors).
         - Optional: ./models/<kind>/priority.txt with one line (subdir name) will be put first if exists.
+        - SENTRA_PREFER_SMALL=1: remaining subdirs are ordered by encoder size (smallest first) instead of by name.
         """
         candidates: List[str] = []
         project_root = Path(__file__).resolve().parents[1]
@@ -82,9 +275,13 @@ class ModelManager:
 
         # Case 2: subdirectories
         subs = [d for d in base.iterdir() if d.is_dir() and is_model_dir(d)]
-        subs_sorted = sorted(subs, key=lambda p: p.name.lower())
+        if prefer_small_models():
+            subs_sorted = sorted(subs, key=lambda p: (self._model_size(p), p.name.lower()))
+        else:
+            subs_sorted = sorted(subs, key=lambda p: p.name.lower())
         if priority:
-            subs_sorted = sorted(subs_sorted, key=lambda p: (0 if p.name == priority else 1, p.name.lower()))
+            # stable sort: keeps the name/size order for the rest
+            subs_sorted = sorted(subs_sorted, key=lambda p: 0 if p.name == priority else 1)
         candidates = [str(p) for p in subs_sorted]
         if not candidates:
             logger.warning(f"No local models discovered under: {base}")
@@ -92,14 +289,75 @@ class ModelManager:
             logger.info(f"Discovered local {kind} models: {candidates}")
         return candidates
 
+    @staticmethod
+    def _strip_config_labels(config) -> None:
+        """Strip whitespace from id2label/label2id once so per-call post-processing can skip it."""
+        id2label = getattr(config, "id2label", None)
+        if not isinstance(id2label, dict) or all(str(v) == str(v).strip() for v in id2label.values()):
+            return
+        config.id2label = {k: str(v).strip() for k, v in id2label.items()}
+        config.label2id = {v: k for k, v in config.id2label.items()}
+
+    @staticmethod
+    def _model_size(d: Path) -> float:
+        """num_hidden_layers * hidden_size from config.json, a cheap proxy for per-request cost; inf if unknown."""
+        try:
+            with (d / "config.json").open("r", encoding="utf-8") as f:
+                cfg = json.load(f)
+            layers = cfg.get("num_hidden_layers") or cfg.get("n_layers") or cfg.get("num_layers")
+            hidden = cfg.get("hidden_size") or cfg.get("dim") or cfg.get("d_model")
+            return float(int(layers) * int(hidden))
+        except Exception:
+            return float("inf")
+
     def _load_first_available(self, model_ids: List[str], task: str, *, multilabel: bool = False) -> Tuple[TextClassificationPipeline, str, float]:
         last_err: Optional[Exception] = None
         for mid in model_ids:
             try:
                 t0 = time.perf_counter()
                 tok = AutoTokenizer.from_pretrained(mid, local_files_only=True)
-                mdl = AutoModelForSequenceClassification.from_pretrained(mid, local_files_only=True)
-                device = get_pipeline_device_index()
+                backend = get_inference_backend()
+                if backend == "trt" and get_pipeline_device_index() < 0:
+                    logger.warning("SENTRA_BACKEND=trt needs a CUDA device; using the onnx CPU backend")
+                    backend = "onnx"
+                if backend == "onnx":
+                    mdl = self._load_onnx_model(mid)
+                    device = -1  # CPUExecutionProvider
+                elif backend == "openvino":
+                    mdl = self._load_openvino_model(mid)
+                    device = -1  # OpenVINO runtime picks its own device
+                elif backend == "trt":
+                    mdl = self._load_trt_model(mid, get_pipeline_device_index())
+                    device = -1  # ORT copies inputs to the TensorRT device itself
+                else:
+                    use_st = self._ensure_safetensors(mid)
+                    device = get_pipeline_device_index()
+                    dtype = self._gpu_torch_dtype(device) if device >= 0 else None
+                    load_kw: Dict[str, Any] = {}
+                    if _HAS_ACCELERATE:
+                        # transformers requires accelerate for low_cpu_mem_usage
+                        load_kw["low_cpu_mem_usage"] = True
+                    mdl = AutoModelForSequenceClassification.from_pretrained(
+                        mid,
+                        local_files_only=True,
+                        use_safetensors=True if use_st else None,
+                        torch_dtype=dtype,
+                        **load_kw,
+                    )
+                    # inference only: no autograd bookkeeping on the weights
+                    mdl.eval()
+                    mdl.requires_grad_(False)
+                    if get_quantize_mode() == "int8":
+                        if device < 0:
+                            import torch  # type: ignore
+
+                            mdl = torch.quantization.quantize_dynamic(mdl, {torch.nn.Linear}, dtype=torch.qint8)
+                        else:
+                            logger.warning("SENTRA_QUANTIZE=int8 is CPU-only for the torch backend; skipped on CUDA")
+                    if device >= 0:
+                        mdl = self._move_to_cuda(mdl, device)
+                    mdl = self._optimize_torch_model(mdl)
+                self._strip_config_labels(getattr(mdl, "config", None))
                 f2a = "sigmoid" if multilabel else None
                 pipe = pipeline(task=task, model=mdl, tokenizer=tok, device=device, function_to_apply=f2a)
                 dt = time.perf_counter() - t0
@@ -110,6 +368,184 @@ class ModelManager:
                 logger.warning(f"Failed to load {mid} for {task}: {e}")
         raise RuntimeError(f"No available model for task={task}. Last error: {last_err}")
 
+    @staticmethod
+    def _ensure_safetensors(mid: str) -> bool:
+        """Make sure <mid> has safetensors weights (mmap zero-copy load instead of unpickling).
+        A lone pytorch_model.bin is converted once via from_pretrained + save_pretrained(safe_serialization=True),
+        which handles tied/shared tensors; the full weights copy is written next to the .bin.
+        Also hints sequential readahead for the weights file. Returns False when no safetensors file is usable.
+        """
+        d = Path(mid)
+        st_path = d / "model.safetensors"
+        st_index = d / "model.safetensors.index.json"
+        bin_path = d / "pytorch_model.bin"
+        if not st_path.exists() and not st_index.exists() and bin_path.exists():
+            try:
+                import tempfile
+
+                mdl = AutoModelForSequenceClassification.from_pretrained(mid, local_files_only=True, use_safetensors=False)
+                with tempfile.TemporaryDirectory(dir=d, prefix=".st-convert-") as tmp:
+                    mdl.save_pretrained(tmp, safe_serialization=True)
+                    # only the weight files are taken over; config/tokenizer files in <mid> stay untouched
+                    for f in Path(tmp).iterdir():
+                        if f.name.endswith(".safetensors") or f.name == st_index.name:
+                            os.replace(f, d / f.name)
+                del mdl
+                logger.info(f"Converted {bin_path} -> safetensors in {d}")
+            except Exception as e:  # noqa: BLE001
+                logger.warning(f"safetensors conversion skipped for {mid}: {e}")
+                return False
+        if not st_path.exists():
+            return st_index.exists()
+        if hasattr(os, "posix_fadvise"):
+            try:
+                fd = os.open(str(st_path), os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+        return True
+
+    @staticmethod
+    def _gpu_torch_dtype(device: int):
+        """SENTRA_GPU_DTYPE -> torch dtype for CUDA weights (None keeps fp32)."""
+        mode = get_gpu_dtype()
+        if mode == "fp32":
+            return None
+        import torch  # type: ignore
+
+        if mode == "fp16":
+            return torch.float16
+        try:
+            bf16_ok = torch.cuda.is_bf16_supported()
+        except Exception:
+            bf16_ok = False
+        if mode == "bf16" and not bf16_ok:
+            logger.warning(f"bf16 not supported on cuda:{device}; using fp16")
+        return torch.bfloat16 if bf16_ok else torch.float16
+
+    @staticmethod
+    def _move_to_cuda(mdl, device: int):
+        """Stage CPU-loaded weights in pinned memory, then copy them to cuda:<device> asynchronously."""
+        try:
+            for p in mdl.parameters():
+                p.data = p.data.pin_memory()
+            for b in mdl.buffers():
+                b.data = b.data.pin_memory()
+            return mdl.to(f"cuda:{device}", non_blocking=True)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Pinned-memory transfer failed ({e}); using a plain .to(cuda)")
+            return mdl.to(f"cuda:{device}")
+
+    @staticmethod
+    def _optimize_torch_model(mdl):
+        """Apply SENTRA_TORCH_OPTIMIZE once at load time; any failure keeps the eager model."""
+        mode = get_torch_optimize_mode()
+        if mode == "off":
+            return mdl
+        if mode in {"bettertransformer", "auto"}:
+            try:
+                from optimum.bettertransformer import BetterTransformer  # type: ignore
+
+                return BetterTransformer.transform(mdl, keep_original_model=False)
+            except Exception as e:  # noqa: BLE001
+                if mode == "bettertransformer":
+                    logger.warning(f"BetterTransformer not applied: {e}")
+                    return mdl
+                logger.info(f"BetterTransformer unavailable ({e}); falling back to torch.compile")
+        try:
+            import torch  # type: ignore
+
+            # compile forward only so the module keeps its HF type for pipeline()
+            mdl.forward = torch.compile(mdl.forward, dynamic=True)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"torch.compile not applied: {e}")
+        return mdl
+
+    @staticmethod
+    def _load_onnx_model(mid: str):
+        """Load an ONNX Runtime model for mid with full graph optimization.
+        The first load exports from the HF weights and caches the graph under <mid>/onnx; later starts load it directly.
+        With SENTRA_QUANTIZE=int8 a dynamic INT8 (avx512_vnni) graph is produced once as onnx/model_quantized.onnx.
+        """
+        import onnxruntime as ort  # type: ignore
+        from optimum.onnxruntime import ORTModelForSequenceClassification  # type: ignore
+
+        so = ort.SessionOptions()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        so.intra_op_num_threads = get_num_threads()
+        load_kw = {"provider": "CPUExecutionProvider", "session_options": so, "local_files_only": True}
+        quantize = get_quantize_mode() == "int8"
+        onnx_dir = Path(mid) / "onnx"
+        if not (onnx_dir / "model.onnx").exists():
+            mdl = ORTModelForSequenceClassification.from_pretrained(mid, export=True, **load_kw)
+            try:
+                mdl.save_pretrained(onnx_dir)
+                logger.info(f"Cached exported ONNX model at {onnx_dir}")
+            except Exception as e:  # noqa: BLE001
+                logger.warning(f"Failed to cache exported ONNX model at {onnx_dir}: {e}")
+                return mdl
+            if not quantize:
+                return mdl
+        if quantize:
+            q_name = "model_quantized.onnx"
+            if not (onnx_dir / q_name).exists():
+                from optimum.onnxruntime import ORTQuantizer  # type: ignore
+                from optimum.onnxruntime.configuration import AutoQuantizationConfig  # type: ignore
+
+                qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=True)
+                ORTQuantizer.from_pretrained(onnx_dir).quantize(save_dir=onnx_dir, quantization_config=qconfig)
+                logger.info(f"Cached INT8 quantized ONNX model at {onnx_dir / q_name}")
+            return ORTModelForSequenceClassification.from_pretrained(onnx_dir, file_name=q_name, **load_kw)
+        return ORTModelForSequenceClassification.from_pretrained(onnx_dir, **load_kw)
+
+    @staticmethod
+    def _load_openvino_model(mid: str):
+        """Load an OpenVINO IR model for mid; the first load exports and caches it under <mid>/openvino."""
+        from optimum.intel import OVModelForSequenceClassification  # type: ignore
+
+        ov_dir = Path(mid) / "openvino"
+        if (ov_dir / "openvino_model.xml").exists():
+            return OVModelForSequenceClassification.from_pretrained(ov_dir, local_files_only=True)
+        mdl = OVModelForSequenceClassification.from_pretrained(mid, export=True, local_files_only=True)
+        try:
+            mdl.save_pretrained(ov_dir)
+            logger.info(f"Cached exported OpenVINO model at {ov_dir}")
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Failed to cache exported OpenVINO model at {ov_dir}: {e}")
+        return mdl
+
+    @staticmethod
+    def _load_trt_model(mid: str, device: int):
+        """Run the (cached) ONNX export of mid on ONNX Runtime's TensorRT EP with FP16.
+        Built engines are cached under <mid>/trt_cache so restarts skip the TensorRT build.
+        """
+        from optimum.onnxruntime import ORTModelForSequenceClassification  # type: ignore
+
+        onnx_dir = Path(mid) / "onnx"
+        if not (onnx_dir / "model.onnx").exists():
+            exported = ORTModelForSequenceClassification.from_pretrained(
+                mid, export=True, provider="CPUExecutionProvider", local_files_only=True
+            )
+            exported.save_pretrained(onnx_dir)
+            logger.info(f"Cached exported ONNX model at {onnx_dir}")
+        cache_dir = Path(mid) / "trt_cache"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        provider_options = {
+            "device_id": device,
+            "trt_fp16_enable": True,
+            "trt_engine_cache_enable": True,
+            "trt_engine_cache_path": str(cache_dir),
+        }
+        return ORTModelForSequenceClassification.from_pretrained(
+            onnx_dir,
+            provider="TensorrtExecutionProvider",
+            provider_options=provider_options,
+            local_files_only=True,
+        )
+
     def ensure_sentiment(self):
         if self._sentiment_pipe is None:
             local = self._build_local_candidates("sentiment")
@@ -120,8 +556,27 @@ class ModelManager:
             pipe, mid, dt = self._load_first_available(local, task="text-classification")
             self._sentiment_pipe, self._sentiment_model_id = pipe, mid
             self._sentiment_load_sec = dt
+            self._sentiment_cache = _RawScoreCache(get_inference_cache_size())
+            self._init_sentiment_labels(pipe, mid)
+            self._sentiment_fast = self._make_fast_classifier(pipe, self._extract_labels(pipe), multilabel=False)
         return self._sentiment_pipe, self._sentiment_model_id
 
+    def _init_sentiment_labels(self, pipe: TextClassificationPipeline, mid: str) -> None:
+        labels: List[str] = []
+        try:
+            id2label = getattr(pipe.model.config, "id2label", {})
+            if isinstance(id2label, dict):
+                labels = [str(v).strip() for v in id2label.values()]
+        except Exception:
+            labels = []
+        self._sentiment_label_bucket = {lbl: _sentiment_bucket(lbl) for lbl in labels}
+        # 判断模型是否天然包含 neutral 类
+        self._sentiment_has_neutral = any("neu" in lbl.lower() for lbl in labels)
+        if mid.startswith(_NLPTOWN_PREFIX):
+            self._sentiment_star_bucket = {lbl: _star_bucket(lbl) for lbl in labels}
+        else:
+            self._sentiment_star_bucket = None
+
     def ensure_emotion(self):
         if self._emotion_pipe is None:
             local = self._build_local_candidates("emotion")
@@ -132,93 +587,216 @@ class ModelManager:
             pipe, mid, dt = self._load_first_available(local, task="text-classification", multilabel=is_emotion_multi_label())
             self._emotion_pipe, self._emotion_model_id = pipe, mid
             self._emotion_load_sec = dt
+            self._emotion_labels = self._extract_labels(pipe)
+            self._emotion_cache = _RawScoreCache(get_inference_cache_size())
+            self._emotion_fast = self._make_fast_classifier(pipe, self._emotion_labels, multilabel=is_emotion_multi_label())
         return self._emotion_pipe, self._emotion_model_id
 
+    def preload_models(self) -> None:
+        """Eagerly load both pipelines (called at service startup) so no request pays the cold load.
+        Runs once per process (each uvicorn worker preloads its own copy)."""
+        with self._preload_lock:
+            if self._preloaded:
+                return
+            for name, ensure in (("sentiment", self.ensure_sentiment), ("emotion", self.ensure_emotion)):
+                try:
+                    pipe, _ = ensure()
+                except Exception as e:  # noqa: BLE001
+                    logger.warning(f"Startup {name} preload skipped: {e}")
+                    continue
+                fast = self._sentiment_fast if name == "sentiment" else self._emotion_fast
+                self._warmup(name, pipe, fast)
+            self._preloaded = True
+
+    _WARMUP_TEXTS = ("warmup", "A longer warmup sentence to prime kernels for typical request sizes.")
+
+    def _warmup(self, name: str, pipe: TextClassificationPipeline, fast: Optional[_FastClassifier]) -> None:
+        """Run a few throwaway inferences so kernel selection / graph optimization happens before the first request.
+        Uses an uncached path so the warmup texts never enter the result cache."""
+        t0 = time.perf_counter()
+        no_cache = _RawScoreCache(0)
+        try:
+            for text in self._WARMUP_TEXTS:
+                self._classify(pipe, no_cache, [text], fast)
+            if get_batch_max_size() > 1:
+                # micro-batching sends batched shapes; warm those too
+                self._classify(pipe, no_cache, [self._WARMUP_TEXTS[i % 2] for i in range(8)], fast)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Warmup for {name} model failed: {e}")
+            return
+        logger.info(f"Warmed up {name} model in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    @staticmethod
+    def _extract_labels(pipe: TextClassificationPipeline) -> Tuple[str, ...]:
+        """Model labels from config.id2label, ordered 0..N-1 when keys are numeric."""
+        try:
+            id2label = getattr(pipe.model.config, "id2label", None)
+            if isinstance(id2label, dict) and id2label:
+                numeric_keys = [k for k in id2label.keys() if isinstance(k, int) or (isinstance(k, str) and str(k).isdigit())]
+                if numeric_keys:
+                    idxs = sorted([int(k) for k in id2label.keys()])
+                    return tuple(str(id2label[i]) for i in idxs)
+                return tuple(str(v) for v in id2label.values())
+        except Exception:
+            pass
+        return ()
+
+    def emotion_labels(self) -> Tuple[str, ...]:
+        """Emotion model labels, computed once at load time (empty if unavailable)."""
+        self.ensure_emotion()
+        return self._emotion_labels
+
     @staticmethod
     def _normalize_scores(items, *, normalize: bool = True) -> List[Tuple[str, float]]:
         """支持 return_all_scores 或 top_k=None 风格输出，统一为 (label, score) 列表。"""
         # items 可能是 [{'label':..., 'score':...}, ...] 或 [[{...}, {...}, ...]]
         if isinstance(items, list) and items and isinstance(items[0], list):
             items = items[0]
-        pairs: List[Tuple[str, float]] = []
-        for it in items:
-            label = str(it.get("label", "")).strip()
-            score = float(it.get("score", 0.0))
-            pairs.append((label, score))
+        if not normalize and items and isinstance(items[0], dict):
+            # 常见路径：pipeline 原样输出，标签已在加载时去空白（见 _strip_config_labels）
+            try:
+                return [(it["label"], it["score"]) for it in items]
+            except KeyError:
+                pass
+        n = len(items)
+        labels: List[str] = [""] * n
+        scores = np.empty(n, dtype=np.float64)
+        for k, it in enumerate(items):
+            labels[k] = str(it.get("label", "")).strip()
+            scores[k] = float(it.get("score", 0.0))
         # 归一化（多标签模式通常不归一化，保持独立概率）
         if normalize:
-            total = sum(max(0.0, s) for _, s in pairs)
-            if total > 0:
-                pairs = [(l, max(0.0, s) / total) for l, s in pairs]
-        return pairs
+            scores = ModelManager._normalize_array(scores)
+        return list(zip(labels, scores.tolist()))
 
-    def analyze_sentiment(self, text: str) -> Dict:
-        pipe, mid = self.ensure_sentiment()
-        # 取全分布
+    @staticmethod
+    def _normalize_array(scores: np.ndarray) -> np.ndarray:
+        """负值截断为0后归一化；总和为0时原样返回。"""
+        clipped = np.maximum(scores, 0.0)
+        # builtin sum over the same sequence keeps totals bit-identical to the previous per-pair loop
+        # (np.sum uses pairwise summation, which can differ in the last ULP)
+        total = sum(clipped.tolist())
+        if total > 0:
+            clipped /= total
+            return clipped
+        return scores
+
+    @staticmethod
+    def _split_pairs(pairs) -> Tuple[List[str], np.ndarray]:
+        labels = [l for l, _ in pairs]
+        scores = np.fromiter((s for _, s in pairs), dtype=np.float64, count=len(labels))
+        return labels, scores
+
+    @staticmethod
+    def _normalize_pairs(pairs) -> List[Tuple[str, float]]:
+        labels, scores = ModelManager._split_pairs(pairs)
+        return list(zip(labels, ModelManager._normalize_array(scores).tolist()))
+
+    @staticmethod
+    def _make_fast_classifier(pipe: TextClassificationPipeline, labels: Tuple[str, ...], *, multilabel: bool) -> Optional[_FastClassifier]:
         try:
-            raw = pipe(text, top_k=None)
+            fast = _FastClassifier(pipe, labels, multilabel=multilabel)
+        except Exception as e:  # noqa: BLE001
+            logger.info(f"Direct inference path unavailable, using pipeline: {e}")
+            return None
+        return fast if fast.enabled else None
+
+    @staticmethod
+    def _run_pipe(pipe: TextClassificationPipeline, inputs, **kwargs):
+        """取全分布；inputs 为 str 或 List[str]（列表时一次前向批量推理）。"""
+        try:
+            return pipe(inputs, top_k=None, **kwargs)
         except Exception:  # transformers 旧版兼容
-            raw = pipe(text, return_all_scores=True)
-        pairs = self._normalize_scores(raw)
+            return pipe(inputs, return_all_scores=True, **kwargs)
+
+    def _infer(self, pipe: TextClassificationPipeline, texts: List[str], fast: Optional[_FastClassifier]) -> List[RawPairs]:
+        """One forward pass over texts (direct path when available, else the pipeline)."""
+        if fast is not None and fast.enabled:
+            try:
+                return fast(texts)
+            except Exception as e:  # noqa: BLE001
+                # 直连推理失败则永久回退到 pipeline
+                logger.warning(f"Direct inference failed, falling back to pipeline: {e}")
+                fast.enabled = False
+        if len(texts) == 1:
+            raws = [self._run_pipe(pipe, texts[0])]
+        else:
+            raws = self._run_pipe(pipe, texts, batch_size=len(texts))
+        return [tuple(self._normalize_scores(raw, normalize=False)) for raw in raws]
+
+    def _classify(
+        self,
+        pipe: TextClassificationPipeline,
+        cache: _RawScoreCache,
+        texts: List[str],
+        fast: Optional[_FastClassifier] = None,
+    ) -> List[RawPairs]:
+        """Raw (label, score) pairs per text. Cached texts skip inference; misses run in batched calls of
+        at most SENTRA_BATCH_MAX texts so a large /analyze/batch request cannot allocate one huge padded batch."""
+        out: List[Optional[RawPairs]] = [cache.get(t) for t in texts]
+        misses = [i for i, r in enumerate(out) if r is None]
+        chunk = max(1, get_batch_max_size())
+        for start in range(0, len(misses), chunk):
+            part = misses[start : start + chunk]
+            for i, pairs in zip(part, self._infer(pipe, [texts[i] for i in part], fast)):
+                cache.put(texts[i], pairs)
+                out[i] = pairs
+        return out  # type: ignore[return-value]
+
+    def analyze_sentiment(self, text: str) -> Dict:
+        pipe, mid = self.ensure_sentiment()
+        raw = self._classify(pipe, self._sentiment_cache, [text], self._sentiment_fast)[0]
+        return self._sentiment_from_pairs(raw, mid)
+
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict]:
+        if not texts:
+            return []
+        pipe, mid = self.ensure_sentiment()
+        raws = self._classify(pipe, self._sentiment_cache, list(texts), self._sentiment_fast)
+        return [self._sentiment_from_pairs(p, mid) for p in raws]
+
+    def _sentiment_from_pairs(self, raw_pairs: RawPairs, mid: str) -> Dict:
         neutral_mode = get_sentiment_neutral_mode()  # auto|on|off
 
         # 特殊模型标签处理
         scores: Dict[str, float] = {}
 
         # 1) nlptown 5星 -> 三类
-        if mid.startswith("nlptown/bert-base-multilingual-uncased-sentiment"):
-            star_scores: Dict[int, float] = {}
-            for lbl, s in pairs:
-                # label like "1 star" or "5 stars"
-                parts = lbl.split()
-                try:
-                    star = int(parts[0])
-                except Exception:
-                    continue
-                star_scores[star] = s
-            neg = star_scores.get(1, 0.0) + star_scores.get(2, 0.0)
-            neu = star_scores.get(3, 0.0)
-            pos = star_scores.get(4, 0.0) + star_scores.get(5, 0.0)
-            total = max(1e-9, neg + neu + pos)
-            scores = {"negative": neg / total, "neutral": neu / total, "positive": pos / total}
-            # 根据 neutral 策略裁剪
+        star_bucket = self._sentiment_star_bucket
+        if star_bucket is not None:
+            labels, raw = self._split_pairs(raw_pairs)
+            raw = self._normalize_array(raw)
+            # label like "1 star" or "5 stars"
+            buckets = np.fromiter(
+                (b if (b := star_bucket.get(lbl)) is not None else _star_bucket(lbl) for lbl in labels),
+                dtype=np.int8,
+                count=len(labels),
+            )
+            keep = buckets >= 0
+            neg, neu, pos = np.bincount(buckets[keep], weights=raw[keep], minlength=3).tolist()
             if neutral_mode == "off":
-                pos_neg = scores.get("positive", 0.0) + scores.get("negative", 0.0)
-                if pos_neg <= 0:
-                    # 无法区分时默认偏正向
-                    scores = {"positive": 1.0, "negative": 0.0}
-                else:
-                    scores = {
-                        "positive": scores.get("positive", 0.0) / pos_neg,
-                        "negative": scores.get("negative", 0.0) / pos_neg,
-                    }
+                # 根据 neutral 策略裁剪；无法区分时默认偏正向
+                pos_neg = pos + neg
+                scores = {"positive": pos / pos_neg, "negative": neg / pos_neg} if pos_neg > 0 else {"positive": 1.0, "negative": 0.0}
+            else:
+                total = max(1e-9, neg + neu + pos)
+                scores = {"negative": neg / total, "neutral": neu / total, "positive": pos / total}
         else:
-            # 通用：将标签名包含正/负/中性的进行标准化
+            # 通用：将标签名包含正/负/中性的进行标准化（标签归类在模型加载时预计算）
+            pairs = self._normalize_pairs(raw_pairs)
             tmp: Dict[str, float] = {}
-            # 判断模型是否天然包含 neutral 类
-            model_has_neutral = False
-            try:
-                id2label = getattr(pipe.model.config, "id2label", {})
-                if isinstance(id2label, dict):
-                    for v in id2label.values():
-                        lv = str(v).lower()
-                        if ("neu" in lv) or ("neutral" in lv):
-                            model_has_neutral = True
-                            break
-            except Exception:
-                pass
+            model_has_neutral = self._sentiment_has_neutral
+            bucket_of = self._sentiment_label_bucket
             unknown_sum = 0.0
             for lbl, s in pairs:
-                l = lbl.lower()
-                if "pos" in l or "positive" in l:
-                    tmp["positive"] = tmp.get("positive", 0.0) + s
-                elif "neg" in l or "negative" in l:
-                    tmp["negative"] = tmp.get("negative", 0.0) + s
-                elif "neu" in l or "neutral" in l:
-                    tmp["neutral"] = tmp.get("neutral", 0.0) + s
-                else:
+                b = bucket_of.get(lbl)
+                if b is None:
+                    b = _sentiment_bucket(lbl)
+                if b == "unknown":
                     # 未知标签：先累计，稍后仅在确有 neutral 且允许时并入 neutral
                     unknown_sum += s
+                else:
+                    tmp[b] = tmp.get(b, 0.0) + s
             # 若模型确实包含 neutral 且策略允许，将未知并入 neutral
             if (model_has_neutral and neutral_mode != "off") and unknown_sum > 0:
                 tmp["neutral"] = tmp.get("neutral", 0.0) + unknown_sum
@@ -244,7 +822,7 @@ class ModelManager:
                 scores = {k: v / total for k, v in scores.items()}
 
         # 取最大为标签
-        label = max(scores.items(), key=lambda x: x[1])[0]
+        label = max(scores, key=scores.__getitem__)
         return {
             "label": label,
             "scores": scores,
@@ -253,29 +831,91 @@ class ModelManager:
 
     def analyze_emotions(self, text: str) -> List[Tuple[str, float]]:
         pipe, _ = self.ensure_emotion()
-        try:
-            raw = pipe(text, top_k=None)
-        except Exception:
-            raw = pipe(text, return_all_scores=True)
+        raw = self._classify(pipe, self._emotion_cache, [text], self._emotion_fast)[0]
+        return self._emotions_from_pairs(raw)
+
+    def analyze_emotions_batch(self, texts: List[str]) -> List[List[Tuple[str, float]]]:
+        if not texts:
+            return []
+        pipe, _ = self.ensure_emotion()
+        raws = self._classify(pipe, self._emotion_cache, list(texts), self._emotion_fast)
+        return [self._emotions_from_pairs(p) for p in raws]
+
+    @staticmethod
+    def _top_order(idx: np.ndarray, scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+        """idx 按分数降序（同分保持原顺序）取前 k 个；k 较小时先用 np.partition 缩小排序范围。"""
+        sub = scores[idx]
+        if k and len(sub) > k:
+            kth = np.partition(sub, len(sub) - k)[len(sub) - k]
+            keep = np.flatnonzero(sub >= kth)  # 含边界同分项，保证与全排序结果一致
+            idx, sub = idx[keep], sub[keep]
+            return idx[np.argsort(-sub, kind="stable")][:k]
+        return idx[np.argsort(-sub, kind="stable")]
+
+    def _emotions_from_pairs(self, raw_pairs: RawPairs) -> List[Tuple[str, float]]:
         multi = is_emotion_multi_label()
-        pairs = self._normalize_scores(raw, normalize=(not multi))
+        labels, scores = self._split_pairs(raw_pairs)
+        if not multi:
+            scores = self._normalize_array(scores)
+        topk = get_emotion_topk()
         # 多标签：基于阈值与TopK选择；若为空，回退Top-1
         if multi:
-            thr = get_emotion_threshold()
-            topk = get_emotion_topk()
-            selected = [(l, s) for (l, s) in pairs if s >= thr]
-            selected.sort(key=lambda x: x[1], reverse=True)
-            if topk and len(selected) > topk:
-                selected = selected[:topk]
-            if not selected and pairs:
-                selected = [max(pairs, key=lambda x: x[1])]
-            return selected
-        # 单标签：返回降序分布，并支持 TopK 可见裁剪（若配置）
-        sorted_pairs = sorted(pairs, key=lambda x: x[1], reverse=True)
-        topk = get_emotion_topk()
-        if topk and len(sorted_pairs) > topk:
-            return sorted_pairs[:topk]
-        return sorted_pairs
+            idx = np.flatnonzero(scores >= get_emotion_threshold())
+            order = self._top_order(idx, scores, topk)
+            if not len(order) and len(labels):
+                order = np.array([int(np.argmax(scores))])
+        else:
+            # 单标签：返回降序分布，并支持 TopK 可见裁剪（若配置）
+            order = self._top_order(np.arange(len(labels)), scores, topk)
+        vals = scores.tolist()
+        return [(labels[k], vals[k]) for k in order.tolist()]
+
+    def _infer_executor(self) -> ThreadPoolExecutor:
+        """Two inference threads so the sentiment and emotion models of one request run side by side."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=INFERENCE_CONCURRENCY, thread_name_prefix="sentra-infer")
+        return self._executor
+
+    async def analyze_sentiment_async(self, text: str) -> Dict:
+        """analyze_sentiment off the event loop; concurrent calls share one batched forward pass."""
+        if get_batch_max_size() <= 1:
+            return await asyncio.get_running_loop().run_in_executor(self._infer_executor(), self.analyze_sentiment, text)
+        if self._sentiment_batcher is None:
+            self._sentiment_batcher = BatchedInferencer(
+                self.analyze_sentiment_batch,
+                max_batch=get_batch_max_size(),
+                max_wait_ms=get_batch_max_wait_ms(),
+                executor=self._infer_executor(),
+            )
+        return await self._sentiment_batcher.submit(text)
+
+    async def analyze_emotions_async(self, text: str) -> List[Tuple[str, float]]:
+        """analyze_emotions off the event loop; concurrent calls share one batched forward pass."""
+        if get_batch_max_size() <= 1:
+            return await asyncio.get_running_loop().run_in_executor(self._infer_executor(), self.analyze_emotions, text)
+        if self._emotion_batcher is None:
+            self._emotion_batcher = BatchedInferencer(
+                self.analyze_emotions_batch,
+                max_batch=get_batch_max_size(),
+                max_wait_ms=get_batch_max_wait_ms(),
+                executor=self._infer_executor(),
+            )
+        return await self._emotion_batcher.submit(text)
+
+    async def analyze_async(self, text: str) -> Tuple[Dict, List[Tuple[str, float]]]:
+        """Sentiment and emotions for one text, both models running concurrently."""
+        sentiment, emotions = await asyncio.gather(self.analyze_sentiment_async(text), self.analyze_emotions_async(text))
+        return sentiment, emotions
+
+    async def aclose(self) -> None:
+        """Stop background micro-batching tasks and the inference threads."""
+        for b in (self._sentiment_batcher, self._emotion_batcher):
+            if b is not None:
+                await b.aclose()
+        self._sentiment_batcher = self._emotion_batcher = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
 
     def get_status(self) -> Dict[str, Any]:
         """Return discovery and loading status for models."""
@@ -1,6 +1,35 @@
+import importlib.util
+import os
+
 import uvicorn
-from app.config import get_host_port
+from app.config import get_host_port, get_num_threads, get_worker_count, is_production
+
+
+def _has(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _configure_threads() -> None:
+    """OpenMP/MKL read these when torch is first imported, so they must be set before workers start."""
+    n = str(get_num_threads())
+    os.environ.setdefault("OMP_NUM_THREADS", n)
+    os.environ.setdefault("MKL_NUM_THREADS", n)
+    # no KMP_AFFINITY default: compact binding would put the concurrent sentiment/emotion
+    # OpenMP teams (and every worker) on the same first cores
+
 
 if __name__ == "__main__":
     host, port = get_host_port()
-    uvicorn.run("app.main:app", host=host, port=port, reload=True)
+    _configure_threads()
+    if is_production():
+        uvicorn.run(
+            "app.main:app",
+            host=host,
+            port=port,
+            workers=get_worker_count(),
+            loop="uvloop" if _has("uvloop") else "auto",
+            http="httptools" if _has("httptools") else "auto",
+            access_log=False,
+        )
+    else:
+        uvicorn.run("app.main:app", host=host, port=port, reload=True)